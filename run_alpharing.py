@@ -1,13 +1,17 @@
 #!/usr/bin/env python3
 
+import atexit
 import glob
+import hashlib
+import json
 import os
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
 import plotly.io as pio
 from absl import app, flags, logging
@@ -92,6 +96,50 @@ flags.DEFINE_boolean(
     'enabled.'
 )
 
+flags.DEFINE_boolean(
+    'use_mmseqs2',
+    False,
+    'Whether to search UniRef30 and environmental sequences with GPU MMseqs2 '
+    '(ColabFold) instead of HHblits. The AlphaFold database paths are still '
+    'required as JackHMMER and HHsearch continue to use them.'
+)
+
+flags.DEFINE_string(
+    'mmseqs2_db_dir',
+    None,
+    'Path to the directory of ColabFold MMseqs2 databases for use by MMseqs2.'
+)
+
+flags.DEFINE_string(
+    'mmseqs2_binary_path',
+    'mmseqs',
+    'Path to the MMseqs2 executable.'
+)
+
+flags.DEFINE_string(
+    'ramdisk_dir',
+    None,
+    'Path to a directory on a RAM disk (e.g. /dev/shm/af_db) to copy databases '
+    'into before running AlphaFold. Recommended if the databases are stored on '
+    'a network filesystem. Databases are only copied if an MSA search still '
+    'needs them.'
+)
+
+flags.DEFINE_list(
+    'ramdisk_databases',
+    ['pdb70_database_path', 'obsolete_pdbs_path'],
+    'Names of the database path flags whose databases are copied into '
+    'ramdisk_dir. Ignored unless ramdisk_dir is set. Make sure the RAM disk can '
+    'hold them, e.g. UniRef30 is roughly 200 GB.'
+)
+
+flags.DEFINE_boolean(
+    'keep_ramdisk',
+    False,
+    'Whether to keep the databases copied into ramdisk_dir when AlphaRING exits '
+    'so that later runs can reuse them instead of copying them again.'
+)
+
 FLAGS = flags.FLAGS
 
 FLAG_NAMES = [
@@ -109,19 +157,26 @@ FLAG_NAMES = [
     'use_gpu_relax'
 ]
 
-WEIGHT_FORMULAS = {
-    'HBOND': lambda edge: 
-        edge['Energy'] * ((1 - (edge['Distance'] / 5.3)) + (edge['Angle'] / 180)),
-    'IONIC': lambda edge: 
-        edge['Energy'] * 2 * (1 - (edge['Distance'] / 4.5)),
-    'PICATION': lambda edge: 
-        edge['Energy'] * ((1 - (edge['Distance'] / 6.7)) + (1 - (edge['Angle'] / 45))),
-    'PIPISTACK': lambda edge: 
-        edge['Energy'] * ((1 - (edge['Distance'] / 7.3)) + (1 - (edge['Angle'] / 90))),
-    'PIHBOND': lambda edge: 
-        edge['Energy'] * 2 * (1 - (edge['Distance'] / 5.0))
+MSA_HITS_FILE_NAMES = {
+    'uniref90_database_path': 'uniref90_hits.sto',
+    'mgnify_database_path': 'mgnify_hits.sto',
+    'bfd_database_path': 'bfd_uniref_hits.a3m',
+    'uniref30_database_path': 'bfd_uniref_hits.a3m'
 }
 
+# Each bond weight is energy * (distance_scale * (1 - distance / distance_max) +
+# angle_offset + angle_slope * angle), where the angle term vanishes for bond
+# types whose angle is negligible
+WEIGHT_PARAMETERS = pd.DataFrame(
+    {
+        'DistanceScale': [1, 2, 1, 1, 2],
+        'DistanceMax': [5.3, 4.5, 6.7, 7.3, 5.0],
+        'AngleOffset': [0, 0, 1, 1, 0],
+        'AngleSlope': [1 / 180, 0, -1 / 45, -1 / 90, 0]
+    },
+    index=['HBOND', 'IONIC', 'PICATION', 'PIPISTACK', 'PIHBOND']
+)
+
 
 def check_fastas(fasta_paths):
     """
@@ -164,9 +219,217 @@ def check_fastas(fasta_paths):
     return variant_position
 
 
+def read_msa_query(msas_dir):
+    """
+    Reads the query sequence of the MSAs in an AlphaFold MSA dir.
+    
+    Args:
+        msas_dir: Path to an AlphaFold MSA dir.
+    
+    Returns:
+        Query sequence of the MSAs, or None if no MSA with a query is found.
+    """
+    # Read the first record of the HHblits hits
+    a3m_path = os.path.join(msas_dir, 'bfd_uniref_hits.a3m')
+    if os.path.exists(a3m_path):
+        query_lines = []
+        with open(a3m_path, 'r') as a3m:
+            for line in a3m:
+                line = line.strip()
+                if line.startswith('>'):
+                    if query_lines:
+                        break
+                elif line and not line.startswith('#'):
+                    query_lines.append(line)
+        if query_lines:
+            return ''.join(query_lines).replace('-', '')
+    
+    # Read the first sequence (split over every block) of the JackHMMER hits
+    sto_path = os.path.join(msas_dir, 'uniref90_hits.sto')
+    if os.path.exists(sto_path):
+        query_name, query_lines = None, []
+        with open(sto_path, 'r') as sto:
+            for line in sto:
+                if not line.strip() or line.startswith(('#', '//')):
+                    continue
+                name, aligned_sequence = line.split()
+                query_name = query_name or name
+                if name == query_name:
+                    query_lines.append(aligned_sequence)
+        if query_lines:
+            return ''.join(query_lines).replace('-', '').replace('.', '').upper()
+    
+    return None
+
+
+def link_msa_caches(flags):
+    """
+    Links the MSA dir of both FASTAs to a cache shared by identical sequences.
+    
+    Args:
+        flags: Object containing the values of the command-line flags.
+    
+    Returns:
+        None
+    """
+    for fasta_path in flags.fasta_paths:
+        # Define the cache dir of the current FASTA by its sequence, MSA tools and
+        # databases
+        with open(fasta_path, "r") as fasta:
+            sequence = str(next(SeqIO.parse(fasta, "fasta")).seq)
+        msa_tools = 'mmseqs2' if flags.use_mmseqs2 else 'hhblits'
+        cache_items = [msa_tools, sequence] + [
+            str(getattr(flags, flag_name)) for flag_name in MSA_HITS_FILE_NAMES
+        ]
+        if flags.use_mmseqs2:
+            cache_items.append(str(flags.mmseqs2_db_dir))
+        cache_key = hashlib.sha1(':'.join(cache_items).encode()).hexdigest()
+        cache_dir = os.path.join(flags.output_dir, 'msa_cache', cache_key)
+        
+        # Move HHblits MSAs of the same sequence from an earlier uncached run into an
+        # empty cache dir, or move them aside when they cannot be reused
+        subdir_name = Path(fasta_path).stem
+        msas_dir = os.path.join(flags.output_dir, subdir_name, 'msas')
+        if os.path.isdir(msas_dir) and not os.path.islink(msas_dir):
+            if (
+                not flags.use_mmseqs2
+                and not (os.path.isdir(cache_dir) and os.listdir(cache_dir))
+                and read_msa_query(msas_dir) == sequence.upper()
+            ):
+                os.makedirs(os.path.dirname(cache_dir), exist_ok=True)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+                shutil.move(msas_dir, cache_dir)
+            else:
+                uncached_msas_dir = f'{msas_dir}_uncached'
+                shutil.rmtree(uncached_msas_dir, ignore_errors=True)
+                shutil.move(msas_dir, uncached_msas_dir)
+        
+        # Link the MSA dir of the current FASTA to its cache dir, replacing a link
+        # to the cache dir of a different sequence, MSA tools or databases
+        os.makedirs(cache_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(msas_dir), exist_ok=True)
+        cache_dir = os.path.abspath(cache_dir)
+        if os.path.islink(msas_dir) and os.readlink(msas_dir) != cache_dir:
+            os.unlink(msas_dir)
+        if not os.path.lexists(msas_dir):
+            os.symlink(cache_dir, msas_dir)
+
+
+def run_mmseqs2(flags):
+    """
+    Runs MMseqs2 with both FASTAs and saves their MSAs for AlphaFold to reuse.
+    
+    Args:
+        flags: Object containing the values of the command-line flags.
+    
+    Returns:
+        None
+    """
+    # Check if the MMseqs2 databases are provided
+    if flags.mmseqs2_db_dir is None:
+        raise ValueError("The MMseqs2 database dir must be provided to use MMseqs2.")
+    
+    for fasta_path in flags.fasta_paths:
+        # Skip the current FASTA if its MSA is already cached
+        subdir_name = Path(fasta_path).stem
+        output_dir = os.path.join(flags.output_dir, subdir_name)
+        msas_dir = os.path.join(output_dir, 'msas')
+        hits_path = os.path.join(msas_dir, 'bfd_uniref_hits.a3m')
+        if os.path.exists(hits_path):
+            continue
+        
+        # Define a ColabFold search command to run for the current FASTA in an empty
+        # search dir
+        search_dir = os.path.join(output_dir, 'mmseqs2')
+        shutil.rmtree(search_dir, ignore_errors=True)
+        search_command = [
+            'colabfold_search',
+            '--db1', 'uniref30_2302_db',
+            '--gpu', '1',
+            '--mmseqs', flags.mmseqs2_binary_path,
+            fasta_path,
+            flags.mmseqs2_db_dir,
+            search_dir
+        ]
+        
+        # Run the ColabFold search command for the current FASTA
+        subprocess.run(search_command, check=True)
+        
+        # Save the MSA where AlphaFold expects its HHblits (BFD and UniRef30) hits
+        msa_paths = glob.glob(os.path.join(search_dir, '*.a3m'))
+        if len(msa_paths) != 1:
+            raise RuntimeError(
+                f"ColabFold search wrote {len(msa_paths)} MSAs instead of one: {search_dir}"
+            )
+        with open(msa_paths[0], 'r') as msa:
+            msa_lines = [
+                line for line in msa.read().replace('\x00', '').splitlines()
+                if not line.startswith('#')
+            ]
+        os.makedirs(msas_dir, exist_ok=True)
+        with open(hits_path, 'w') as file:
+            file.write('\n'.join(msa_lines) + '\n')
+
+
+def stage_databases_to_ramdisk(flags):
+    """
+    Copies databases onto a RAM disk and returns their new paths.
+    
+    Args:
+        flags: Object containing the values of the command-line flags.
+    
+    Returns:
+        Dictionary mapping database path flag names to their RAM disk paths.
+    """
+    # Find the MSA databases still needed by a search, i.e. whose hits are neither
+    # cached nor found by MMseqs2 for both FASTAs (the template search database
+    # and obsolete PDBs are read on every run)
+    searched_flag_names = [
+        flag_name for flag_name, hits_file_name in MSA_HITS_FILE_NAMES.items()
+        if not all(
+            os.path.exists(os.path.join(
+                flags.output_dir, Path(fasta_path).stem, 'msas', hits_file_name
+            ))
+            for fasta_path in flags.fasta_paths
+        )
+    ]
+    
+    staged_paths = {}
+    # Copy each database (all files sharing its path as a prefix for HH-suite)
+    for flag_name in flags.ramdisk_databases:
+        if flag_name in MSA_HITS_FILE_NAMES and flag_name not in searched_flag_names:
+            continue
+        
+        # Check if the current database exists
+        database_path = getattr(flags, flag_name)
+        database_files = glob.glob(f'{database_path}_*')
+        if os.path.isfile(database_path):
+            database_files.append(database_path)
+        if not database_files:
+            raise ValueError(f"No database files match --{flag_name}={database_path}.")
+        
+        # Copy the current database unless an earlier kept copy is already staged
+        staged_dir = os.path.join(flags.ramdisk_dir, flag_name)
+        os.makedirs(staged_dir, exist_ok=True)
+        if not flags.keep_ramdisk:
+            atexit.register(shutil.rmtree, staged_dir, ignore_errors=True)
+        for database_file in database_files:
+            staged_file = os.path.join(staged_dir, os.path.basename(database_file))
+            if (
+                not os.path.exists(staged_file)
+                or os.path.getsize(staged_file) != os.path.getsize(database_file)
+            ):
+                shutil.copy2(database_file, staged_file)
+        
+        # Collect the RAM disk path of the current database
+        staged_paths[flag_name] = os.path.join(staged_dir, os.path.basename(database_path))
+    
+    return staged_paths
+
+
 def run_alphafold(flags, flag_names):
     """
-    Runs AlphaFold with input and returns the best model for both FASTAs.
+    Runs AlphaFold on both FASTAs (in parallel across GPUs) and returns their best models.
     
     Args:
         flags: Object containing the values of the command-line flags.
@@ -178,29 +441,90 @@ def run_alphafold(flags, flag_names):
     # Define the base AlphaFold command
     alpharing_dir = Path(__file__).parent
     alphafold_path = os.path.join(alpharing_dir, 'alphafold', 'run_alphafold.py')
-    alphafold_command = f'python3 {alphafold_path}'
+    base_command = ['python3', alphafold_path]
+    
+    # Copy the requested databases onto the RAM disk
+    staged_paths = stage_databases_to_ramdisk(flags) if flags.ramdisk_dir else {}
 
-    # Add flags to the AlphaFold command
+    # Add flags (except the FASTA paths) to the base AlphaFold command
     for flag_name in flag_names:
-        flag_value = getattr(flags, flag_name)
-        if flag_value is not None:
-            if flag_name == 'fasta_paths':
-                flag_value = ','.join(flag_value)
-            else:
-                flag_value = str(flag_value)
-            alphafold_command += f' --{flag_name}={flag_value}'
-
-    # Run the AlphaFold command
-    subprocess.run(alphafold_command, shell=True, check=True)
+        flag_value = staged_paths.get(flag_name, getattr(flags, flag_name))
+        if flag_name != 'fasta_paths' and flag_value is not None:
+            base_command.append(f'--{flag_name}={flag_value}')
+
+    # Find the GPUs visible to AlphaFold (all GPUs listed by nvidia-smi unless
+    # CUDA_VISIBLE_DEVICES is set)
+    visible_devices = os.environ.get('CUDA_VISIBLE_DEVICES')
+    if visible_devices is not None:
+        gpu_devices = [device for device in visible_devices.split(',') if device]
+    else:
+        try:
+            nvidia_smi = subprocess.run(
+                ['nvidia-smi', '-L'], capture_output=True, text=True, check=True
+            )
+            gpu_count = sum(line.startswith('GPU ') for line in nvidia_smi.stdout.splitlines())
+        except (OSError, subprocess.CalledProcessError):
+            gpu_count = 0
+        gpu_devices = [str(device) for device in range(gpu_count)]
     
-    # Collect the best model paths
-    model_paths = []
+    # Run one AlphaFold command per FASTA if there are several GPUs, or else one
+    # command for all FASTAs so that the model is loaded and compiled only once
     fasta_paths = flags.fasta_paths
     output_dir = flags.output_dir
+    if len(gpu_devices) > 1:
+        fasta_path_groups = [[fasta_path] for fasta_path in fasta_paths]
+    else:
+        fasta_path_groups = [fasta_paths]
+    
+    # Define an AlphaFold command and environment to run for each group of FASTAs
+    alphafold_commands, alphafold_envs = [], []
+    for index, fasta_path_group in enumerate(fasta_path_groups):
+        alphafold_command = [*base_command, f'--fasta_paths={",".join(fasta_path_group)}']
+        
+        # Reuse MSAs from MMseqs2, an earlier run or an identical sequence (missing
+        # MSAs are still searched for)
+        for fasta_path in fasta_path_group:
+            subdir_name = Path(fasta_path).stem
+            features_path = os.path.join(output_dir, subdir_name, 'features.pkl')
+            msas_dir = os.path.join(output_dir, subdir_name, 'msas')
+            if (
+                flags.use_mmseqs2
+                or os.path.exists(features_path)
+                or (os.path.isdir(msas_dir) and os.listdir(msas_dir))
+            ):
+                alphafold_command.append('--use_precomputed_msas=True')
+                break
+        alphafold_commands.append(alphafold_command)
+        
+        # Pin each command to a GPU round-robin when there is one command per FASTA
+        alphafold_env = dict(os.environ)
+        if len(fasta_path_groups) > 1:
+            alphafold_env['CUDA_VISIBLE_DEVICES'] = gpu_devices[index % len(gpu_devices)]
+        alphafold_envs.append(alphafold_env)
+
+    # Run the AlphaFold commands in parallel, at most one per GPU so that no two
+    # commands share a GPU
+    max_workers = max(1, min(len(gpu_devices), len(alphafold_commands)))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                subprocess.run, alphafold_command, check=True, env=alphafold_env
+            )
+            for alphafold_command, alphafold_env in zip(alphafold_commands, alphafold_envs)
+        ]
+        for future in futures:
+            future.result()
+    
+    # Collect the best model paths
+    model_paths = []
     for fasta_path in fasta_paths:
         subdir_name = Path(fasta_path).stem
-        model_path_pattern = os.path.join(output_dir, subdir_name, 'relaxed*.pdb')
-        model_path = glob.glob(model_path_pattern)[0]
+        ranking_path = os.path.join(output_dir, subdir_name, 'ranking_debug.json')
+        with open(ranking_path, 'r') as ranking:
+            best_model_name = json.load(ranking)['order'][0]
+        model_path = os.path.join(output_dir, subdir_name, f'relaxed_{best_model_name}.pdb')
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"AlphaFold did not write a relaxed model: {model_path}")
         model_paths.append(model_path)
 
     return model_paths
@@ -208,7 +532,7 @@ def run_alphafold(flags, flag_names):
 
 def run_ring(model_paths):
     """
-    Runs RING with both AlphaFold models and returns their edges and nodes.
+    Runs RING with both AlphaFold models in parallel and returns their edges and nodes.
     
     Args:
         model_paths: List of paths to the best wild-type and variant model.
@@ -220,41 +544,51 @@ def run_ring(model_paths):
     alpharing_dir = Path(__file__).parent
     ring_path = os.path.join(alpharing_dir, 'ring', 'out', 'bin', 'ring')
     
-    edge_paths, node_paths = [], []
+    ring_commands = []
     # Define a RING command to run for each model
     for model_path in model_paths:
         output_dir = Path(model_path).parent
-        ring_command = (
-            f'{ring_path} '
-            f'-i {model_path} '
-            f'--out_dir {output_dir} '
-            '--no_add_H '
-            '--all_edges '
+        ring_command = [
+            ring_path,
+            '-i', model_path,
+            '--out_dir', str(output_dir),
+            '--no_add_H',
+            '--all_edges',
             '--relaxed'
-        )
-        
-        # Run the RING command for the current model
-        subprocess.run(ring_command, shell=True, check=True)
-        
-        # Collect the edge and node paths for the current model
-        edge_path_pattern = f'{output_dir}/*.pdb_ringEdges'
-        node_path_pattern = f'{output_dir}/*.pdb_ringNodes'
-        patterns = [edge_path_pattern, node_path_pattern]
+        ]
+        ring_commands.append(ring_command)
+    
+    # Run the RING commands in parallel
+    max_workers = min(len(ring_commands), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(subprocess.run, ring_command, check=True)
+            for ring_command in ring_commands
+        ]
+        for future in futures:
+            future.result()
+    
+    edge_paths, node_paths = [], []
+    # Collect the edge and node paths for each model
+    for model_path in model_paths:
+        edge_path = f'{model_path}_ringEdges'
+        node_path = f'{model_path}_ringNodes'
         paths_all = [edge_paths, node_paths]
-        for pattern, paths in zip(patterns, paths_all):
-            path = glob.glob(pattern)[0]
+        for path, paths in zip([edge_path, node_path], paths_all):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"RING did not write an output file: {path}")
             paths.append(path)
         
     return edge_paths, node_paths
 
 
-def calculate_edge_weights(edge_paths, weight_formulas):
+def calculate_edge_weights(edge_paths, weight_parameters):
     """
     Calculates the weights of the RING edges and return them.
     
     Args:
         edge_paths: List of paths to the RING edge files.
-        weight_formulas: Dictionary mapping edge types to their weight formulas.
+        weight_parameters: DataFrame of weight formula parameters indexed by edge type.
     
     Returns:
         List of RING edge pandas DataFrames with weights.
@@ -262,12 +596,23 @@ def calculate_edge_weights(edge_paths, weight_formulas):
     edges_all = []
     # Calculate the edge weights for each edges file
     for edge_path in edge_paths:
-        edges = pd.read_csv(edge_path, sep='\t')
-        edge_types = [interaction.split(':')[0] for interaction in edges['Interaction']]
-        edges['Weight'] = [
-            weight_formulas.get(edge_type, lambda _: pd.NA)(edge)
-            for edge, edge_type in zip(edges.to_dict('records'), edge_types)
-        ]
+        edges = pd.read_csv(edge_path, sep='\t', engine='pyarrow')
+        edge_types = edges['Interaction'].str.split(':', n=1).str[0].to_numpy()
+        parameters = weight_parameters.reindex(edge_types)
+        distance_terms = parameters['DistanceScale'].to_numpy() * (
+            1 - (edges['Distance'].to_numpy() / parameters['DistanceMax'].to_numpy())
+        )
+        angle_slopes = parameters['AngleSlope'].to_numpy()
+        angle_terms = parameters['AngleOffset'].to_numpy() + np.where(
+            angle_slopes != 0, angle_slopes * edges['Angle'].to_numpy(), 0
+        )
+        edges['Weight'] = edges['Energy'].to_numpy() * (distance_terms + angle_terms)
+        edges = edges.astype({
+            'Energy': np.float32,
+            'Distance': np.float32,
+            'Angle': np.float32,
+            'Weight': np.float32
+        })
         
         # Save the current updated edges file
         edges.to_csv(edge_path, sep='\t', index=False)
@@ -292,11 +637,14 @@ def calculate_node_weights(node_paths, edges_all):
     nodes_all = []
     # Calculate the node weights for each nodes file
     for node_path, edges in zip(node_paths, edges_all):
-        nodes = pd.read_csv(node_path, sep='\t', index_col='NodeId')
+        nodes = pd.read_csv(node_path, sep='\t', index_col='NodeId', engine='pyarrow')
+        edge_ends = pd.concat([
+            edges[['NodeId1', 'Weight']].rename(columns={'NodeId1': 'NodeId'}),
+            edges[['NodeId2', 'Weight']].rename(columns={'NodeId2': 'NodeId'})
+        ])
         nodes['Weight'] = nodes.index.map(
-            edges.groupby('NodeId1')['Weight'].sum()
-            .add(edges.groupby('NodeId2')['Weight'].sum(), fill_value=0)
-        ).fillna(0)
+            edge_ends.groupby('NodeId', sort=False)['Weight'].sum()
+        ).fillna(0).astype(np.float32)
         nodes.reset_index(inplace=True)
         
         # Save the current updated nodes file
@@ -321,13 +669,11 @@ def plot_node_weights(nodes_all, model_paths):
     """
     # Prepare the node weight plots for each model
     for nodes, model_path in zip(nodes_all, model_paths):
-        node_names = [
-            f"{node_id.split(':')[3][0]}"
-            f"{node_id.split(':')[3][1:].lower()}"
-            f"{node_id.split(':')[1]}"
-            for node_id in nodes['NodeId']
-        ]
-        node_numbers = nodes['NodeId'].str.split(':').str[1].astype(int)
+        node_id_parts = nodes['NodeId'].str.split(':', expand=True)
+        node_names = (
+            node_id_parts[3].str[0] + node_id_parts[3].str[1:].str.lower() + node_id_parts[1]
+        )
+        node_numbers = node_id_parts[1].astype(np.int32).to_numpy()
         maximum_weight = nodes['Weight'].max()
         minimum_weight = nodes['Weight'].min()
         normalised_weights = (
@@ -359,19 +705,19 @@ def plot_node_weights(nodes_all, model_paths):
         )
         
         # Add a normalised color bar to the node weight plot
-        for index, normalised_weight in enumerate(normalised_weights):
-            color = px.colors.sample_colorscale('Reds', normalised_weight)[0]
-            figure.add_shape(
-                type="rect",
-                x0=index + 1,
-                x1=index + 2,
-                yref='paper',
-                y0=0,
-                y1=0.025,
-                line=dict(width=0),
-                fillcolor=color,
-                opacity=1
-            )
+        figure.add_trace(go.Heatmap(
+            z=[np.asarray(normalised_weights)],
+            x=node_numbers,
+            zmin=0,
+            zmax=1,
+            colorscale='Reds',
+            showscale=False,
+            hoverinfo='skip',
+            yaxis='y2'
+        ))
+        figure.update_layout(
+            yaxis2={'domain': [0, 0.025], 'anchor': 'x', 'visible': False}
+        )
         
         # Save the node weight plot to file
         model_name = Path(model_path).name
@@ -394,13 +740,10 @@ def calculate_alpharing_score(nodes_all, model_paths, variant_position):
         None
     """
     # Get the weight of the residue at the variant position (wildtype and variant)
-    weights = []
-    for nodes in nodes_all:
-        weight = nodes.iloc[variant_position]['Weight']
-        weights.append(weight)
+    weights = [nodes['Weight'].iat[variant_position] for nodes in nodes_all]
 
     # Calculate the AlphaRING score
-    wildtype_weight, variant_weight = [weight + 1 for weight in weights]
+    wildtype_weight, variant_weight = [float(weight) + 1 for weight in weights]
     fold_change = variant_weight / wildtype_weight
     alpharing_score = abs(np.log2(fold_change))
 
@@ -416,6 +759,13 @@ def main(_):
     logging.info('(AlphaRING) Checking FASTA files')
     variant_position = check_fastas(FLAGS.fasta_paths)
     
+    logging.info('(AlphaRING) Linking cached MSAs')
+    link_msa_caches(FLAGS)
+    
+    if FLAGS.use_mmseqs2:
+        logging.info('(AlphaRING) Running MMseqs2:')
+        run_mmseqs2(FLAGS)
+    
     logging.info('(AlphaRING) Running AlphaFold:')
     model_paths = run_alphafold(FLAGS, FLAG_NAMES)
 
@@ -423,7 +773,7 @@ def main(_):
     edge_paths, node_paths = run_ring(model_paths)
 
     logging.info('(AlphaRING) Calculating edge (bond) weights')
-    edges_all = calculate_edge_weights(edge_paths, WEIGHT_FORMULAS)
+    edges_all = calculate_edge_weights(edge_paths, WEIGHT_PARAMETERS)
     
     logging.info('(AlphaRING) Calculating node (residue) weights')
     nodes_all = calculate_node_weights(node_paths, edges_all)